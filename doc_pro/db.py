@@ -1,94 +1,184 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
 import sqlite3
+import threading
+import weakref
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Any
 
 DB_DIR = Path("data")
 DB_PATH = DB_DIR / "app.db"
 
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT_SECONDS = 30.0
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+_local = threading.local()
+_conns: set[sqlite3.Connection] = set()
+_conns_lock = threading.Lock()
+
 
 def _connect() -> sqlite3.Connection:
-    DB_DIR.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=BUSY_TIMEOUT_SECONDS,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+class _ThreadConn:
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+
+def _get_conn() -> sqlite3.Connection:
+    holder: _ThreadConn | None = getattr(_local, "holder", None)
+    if holder is None:
+        conn = _connect()
+        holder = _ThreadConn(conn)
+        # Worker threads (anyio, executors) exit when idle; the holder dies
+        # with the thread's locals and takes the connection with it.
+        weakref.finalize(holder, _release_conn, conn)
+        _local.holder = holder
+        with _conns_lock:
+            _conns.add(conn)
+    return holder.conn
+
+
+def _release_conn(conn: sqlite3.Connection) -> None:
+    with _conns_lock:
+        _conns.discard(conn)
+    conn.close()
+
+
+def close_db() -> None:
+    global _local
+    # Dropping the old locals runs the finalizers, which take _conns_lock.
+    _local = threading.local()
+    with _conns_lock:
+        conns = list(_conns)
+        _conns.clear()
+    for conn in conns:
+        conn.close()
+
+
+atexit.register(close_db)
+
+
 def init_db() -> None:
-    with _connect() as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS documents (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                filename TEXT NOT NULL,
-                file_path TEXT NOT NULL,
-                status TEXT NOT NULL,
-                page_count INTEGER DEFAULT 0,
-                error_message TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS document_chunks (
-                id TEXT PRIMARY KEY,
-                document_id TEXT NOT NULL,
-                page INTEGER NOT NULL,
-                chunk_index INTEGER NOT NULL,
-                text_raw TEXT NOT NULL,
-                text_zh TEXT,
-                embedding_status TEXT NOT NULL DEFAULT 'pending',
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (document_id) REFERENCES documents(id)
-            )
-            """
-        )
-        conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_document_chunks_document_id ON document_chunks(document_id)"
-        )
-        conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_document_chunks_document_page ON document_chunks(document_id, page)"
-        )
-        _ensure_column(
-            conn,
-            "documents",
-            "translation_status",
-            "TEXT NOT NULL DEFAULT 'pending'",
+    DB_DIR.mkdir(parents=True, exist_ok=True)
+    conn = _get_conn()
+    with conn:
+        _create_schema(conn)
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS documents (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            status TEXT NOT NULL,
+            page_count INTEGER DEFAULT 0,
+            error_message TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
         )
-        _ensure_column(
-            conn,
-            "documents",
-            "translation_error_message",
-            "TEXT",
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS document_chunks (
+            id TEXT PRIMARY KEY,
+            document_id TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            text_raw TEXT NOT NULL,
+            text_zh TEXT,
+            embedding_status TEXT NOT NULL DEFAULT 'pending',
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (document_id) REFERENCES documents(id)
         )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_document_chunks_document_page_chunk
+        ON document_chunks(document_id, page, chunk_index)
+        """
+    )
+    conn.execute("DROP INDEX IF EXISTS idx_document_chunks_document_id")
+    conn.execute("DROP INDEX IF EXISTS idx_document_chunks_document_page")
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_document_chunks_untranslated
+        ON document_chunks(document_id)
+        WHERE text_zh IS NULL OR text_zh = ''
+        """
+    )
+    _ensure_column(
+        conn,
+        "documents",
+        "translation_status",
+        "TEXT NOT NULL DEFAULT 'pending'",
+    )
+    _ensure_column(
+        conn,
+        "documents",
+        "translation_error_message",
+        "TEXT",
+    )
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    conn = _get_conn()
+    with conn:
+        yield conn
 
 
 def execute(query: str, params: tuple[Any, ...] = ()) -> None:
-    with _connect() as conn:
+    conn = _get_conn()
+    with conn:
         conn.execute(query, params)
-        conn.commit()
 
 
-def executemany(query: str, params_list: list[tuple[Any, ...]]) -> None:
-    with _connect() as conn:
+async def aexecute(query: str, params: tuple[Any, ...] = ()) -> None:
+    await asyncio.to_thread(execute, query, params)
+
+
+def executemany(query: str, params_list: Iterable[tuple[Any, ...]]) -> None:
+    conn = _get_conn()
+    with conn:
         conn.executemany(query, params_list)
-        conn.commit()
 
 
 def fetch_one(query: str, params: tuple[Any, ...] = ()) -> dict[str, Any] | None:
-    with _connect() as conn:
-        row = conn.execute(query, params).fetchone()
-        return dict(row) if row else None
+    row = _get_conn().execute(query, params).fetchone()
+    return dict(row) if row else None
 
 
-def fetch_all(query: str, params: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
-    with _connect() as conn:
-        rows = conn.execute(query, params).fetchall()
-        return [dict(row) for row in rows]
+def fetch_all(query: str, params: tuple[Any, ...] = ()) -> list[sqlite3.Row]:
+    return _get_conn().execute(query, params).fetchall()
 
 
 def _ensure_column(
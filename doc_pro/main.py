@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import shutil
 import uuid
 from collections.abc import AsyncIterator
@@ -8,13 +9,67 @@ from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any
 
+import orjson
 from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
 
 from doc_pro import db
-from doc_pro.worker import enqueue_document, enqueue_translation, start_worker
+from doc_pro.worker import enqueue_document, enqueue_translation, start_worker, stop_worker
 
 UPLOAD_DIR = Path("data/uploads")
 ALLOWED_EXTENSIONS = {".pdf"}
+UPLOAD_COPY_BUFFER_SIZE = 1 << 20
+
+_SQL_SELECT_DOC_ID = "SELECT id FROM documents WHERE id = ?"
+_SQL_SELECT_DOC_STATUS = "SELECT id, status FROM documents WHERE id = ?"
+_SQL_INSERT_DOC = """
+INSERT INTO documents (id, user_id, filename, file_path, status, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_SELECT_DOC = """
+SELECT
+    id,
+    user_id,
+    filename,
+    status,
+    page_count,
+    error_message,
+    translation_status,
+    translation_error_message,
+    created_at,
+    updated_at
+FROM documents
+WHERE id = ?
+"""
+_SQL_SELECT_CHUNKS_BY_DOC = """
+SELECT
+    id, page, chunk_index, text_raw, text_zh, embedding_status, created_at,
+    (
+        SELECT COUNT(NULLIF(text_zh, ''))
+        FROM document_chunks
+        WHERE document_id = ?
+    ) AS cached_count
+FROM document_chunks
+WHERE document_id = ?
+ORDER BY page ASC, chunk_index ASC
+"""
+_SQL_SELECT_CHUNKS_BY_PAGE = """
+SELECT
+    id, page, chunk_index, text_raw, text_zh, embedding_status, created_at,
+    (
+        SELECT COUNT(NULLIF(text_zh, ''))
+        FROM document_chunks
+        WHERE document_id = ? AND page = ?
+    ) AS cached_count
+FROM document_chunks
+WHERE document_id = ? AND page = ?
+ORDER BY chunk_index ASC
+"""
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
 
 
 @asynccontextmanager
@@ -23,9 +78,15 @@ async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
     start_worker()
     yield
+    stop_worker()
 
 
-app = FastAPI(title="doc-pro API", version="0.1.0", lifespan=lifespan)
+app = FastAPI(
+    title="doc-pro API",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 
 @app.post("/api/documents")
@@ -39,15 +100,11 @@ async def create_document(
 
     document_id = str(uuid.uuid4())
     target_path = UPLOAD_DIR / f"{document_id}.pdf"
-    with target_path.open("wb") as out:
-        shutil.copyfileobj(file.file, out)
+    await asyncio.to_thread(_save_upload, file, target_path)
 
     now = _now_iso()
-    db.execute(
-        """
-        INSERT INTO documents (id, user_id, filename, file_path, status, created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
+    await db.aexecute(
+        _SQL_INSERT_DOC,
         (
             document_id,
             user_id,
@@ -64,24 +121,7 @@ async def create_document(
 
 @app.get("/api/documents/{document_id}")
 def get_document(document_id: str) -> dict[str, Any]:
-    doc = db.fetch_one(
-        """
-        SELECT
-            id,
-            user_id,
-            filename,
-            status,
-            page_count,
-            error_message,
-            translation_status,
-            translation_error_message,
-            created_at,
-            updated_at
-        FROM documents
-        WHERE id = ?
-        """,
-        (document_id,),
-    )
+    doc = db.fetch_one(_SQL_SELECT_DOC, (document_id,))
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found.")
     return doc
@@ -92,7 +132,7 @@ def translate_document(
     document_id: str,
     page: int | None = None,
 ) -> dict[str, Any]:
-    doc = db.fetch_one("SELECT id, status FROM documents WHERE id = ?", (document_id,))
+    doc = db.fetch_one(_SQL_SELECT_DOC_STATUS, (document_id,))
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found.")
     if doc["status"] != "ready":
@@ -106,64 +146,60 @@ def get_document_chunks(
     document_id: str,
     page: int | None = None,
     lang: str = "raw",
-) -> dict[str, Any]:
-    exists = db.fetch_one("SELECT id FROM documents WHERE id = ?", (document_id,))
+) -> ORJSONResponse:
+    exists = db.fetch_one(_SQL_SELECT_DOC_ID, (document_id,))
     if not exists:
         raise HTTPException(status_code=404, detail="Document not found.")
     if lang not in {"raw", "zh"}:
         raise HTTPException(status_code=400, detail="lang must be 'raw' or 'zh'.")
 
     if page is None:
-        chunks = db.fetch_all(
-            """
-            SELECT
-                id, page, chunk_index, text_raw, text_zh, embedding_status, created_at
-            FROM document_chunks
-            WHERE document_id = ?
-            ORDER BY page ASC, chunk_index ASC
-            """,
-            (document_id,),
-        )
+        chunks = db.fetch_all(_SQL_SELECT_CHUNKS_BY_DOC, (document_id, document_id))
     else:
-        chunks = db.fetch_all(
-            """
-            SELECT
-                id, page, chunk_index, text_raw, text_zh, embedding_status, created_at
-            FROM document_chunks
-            WHERE document_id = ? AND page = ?
-            ORDER BY chunk_index ASC
-            """,
-            (document_id, page),
-        )
+        chunks = db.fetch_all(_SQL_SELECT_CHUNKS_BY_PAGE, (document_id, page, document_id, page))
 
     if lang == "zh":
-        transformed_chunks: list[dict[str, Any]] = []
-        for chunk in chunks:
-            is_cached = bool(chunk["text_zh"])
-            translated_text = chunk["text_zh"] if is_cached else chunk["text_raw"]
-            transformed_chunks.append(
-                {
-                    "id": chunk["id"],
-                    "page": chunk["page"],
-                    "chunk_index": chunk["chunk_index"],
-                    "text": translated_text,
-                    "text_raw": chunk["text_raw"],
-                    "text_zh": chunk["text_zh"],
-                    "is_cached_translation": is_cached,
-                    "embedding_status": chunk["embedding_status"],
-                    "created_at": chunk["created_at"],
-                }
-            )
-        chunks = transformed_chunks
-
-    cache_count = sum(1 for c in chunks if c.get("text_zh"))
-    return {
+        payload_chunks = [
+            {
+                "id": chunk["id"],
+                "page": chunk["page"],
+                "chunk_index": chunk["chunk_index"],
+                "text": chunk["text_zh"] or chunk["text_raw"],
+                "text_raw": chunk["text_raw"],
+                "text_zh": chunk["text_zh"],
+                "is_cached_translation": bool(chunk["text_zh"]),
+                "embedding_status": chunk["embedding_status"],
+                "created_at": chunk["created_at"],
+            }
+            for chunk in chunks
+        ]
+    else:
+        payload_chunks = [
+            {
+                "id": chunk["id"],
+                "page": chunk["page"],
+                "chunk_index": chunk["chunk_index"],
+                "text_raw": chunk["text_raw"],
+                "text_zh": chunk["text_zh"],
+                "embedding_status": chunk["embedding_status"],
+                "created_at": chunk["created_at"],
+            }
+            for chunk in chunks
+        ]
+
+    payload = {
         "document_id": document_id,
         "count": len(chunks),
         "lang": lang,
-        "cached_translation_count": cache_count,
-        "chunks": chunks,
+        "cached_translation_count": chunks[0]["cached_count"] if chunks else 0,
+        "chunks": payload_chunks,
     }
+    return ORJSONResponse(payload)
+
+
+def _save_upload(file: UploadFile, target_path: Path) -> None:
+    with target_path.open("wb") as out:
+        shutil.copyfileobj(file.file, out, UPLOAD_COPY_BUFFER_SIZE)
 
 
 def _now_iso() -> str:
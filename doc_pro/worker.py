@@ -1,217 +1,373 @@
 from __future__ import annotations
 
-import queue
+import functools
+import itertools
+import logging
+import multiprocessing
+import os
 import threading
 import uuid
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import UTC, datetime
 from pathlib import Path
+from typing import Any
 
 from pypdf import PdfReader
 
 from doc_pro.ai import translate_text_with_gen_ai
 from doc_pro import db
 
-Job = tuple[str, str, int | None]
-_job_queue: "queue.Queue[Job]" = queue.Queue()
-_worker_started = False
-_worker_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+_translate_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_extract_pool: ProcessPoolExecutor | None = None
+_pending_jobs: dict[str, deque[tuple[Callable[..., None], tuple[Any, ...]]]] = {}
+_page_reader: PdfReader | None = None
+_page_reader_path: str | None = None
 
 CHUNK_SIZE = 800
 CHUNK_OVERLAP = 160
+JOB_MAX_WORKERS = 8
+# Serial extraction of a short PDF finishes in ~0.1 s, which is about what
+# dispatching pages to the pool and re-opening the file in each worker costs.
+PARALLEL_EXTRACT_MIN_PAGES = 16
+TRANSLATE_BATCH_SIZE = 32
+TRANSLATE_MAX_WORKERS = 8
+
+_SQL_SELECT_DOC_FILE = "SELECT id, file_path FROM documents WHERE id = ?"
+_SQL_SELECT_DOC_STATUS = "SELECT id, status FROM documents WHERE id = ?"
+_SQL_UPDATE_DOC_PROCESSING = (
+    "UPDATE documents SET status = ?, updated_at = ?, error_message = NULL WHERE id = ?"
+)
+_SQL_UPDATE_DOC_FAILED = (
+    "UPDATE documents SET status = ?, error_message = ?, updated_at = ? WHERE id = ?"
+)
+_SQL_UPDATE_CHUNK_ZH = "UPDATE document_chunks SET text_zh = ? WHERE id = ?"
+_SQL_UPDATE_TRANSLATION_STATUS = """
+UPDATE documents
+SET translation_status = ?, translation_error_message = ?, updated_at = ?
+WHERE id = ?
+"""
+_SQL_DELETE_CHUNKS = "DELETE FROM document_chunks WHERE document_id = ?"
+_SQL_ATTACH_STAGING = "ATTACH DATABASE ? AS staging"
+_SQL_DETACH_STAGING = "DETACH DATABASE staging"
+_STAGING_PRAGMAS = (
+    "PRAGMA staging.journal_mode=OFF",
+    "PRAGMA staging.synchronous=OFF",
+)
+_SQL_CREATE_STAGED_CHUNKS = """
+CREATE TABLE staging.staged_chunks (
+    id TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    text_raw TEXT NOT NULL,
+    created_at TEXT NOT NULL
+)
+"""
+_SQL_STAGE_CHUNK = """
+INSERT INTO staging.staged_chunks (id, document_id, page, chunk_index, text_raw, created_at)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+_SQL_INSERT_STAGED_CHUNKS = """
+INSERT INTO document_chunks (
+    id, document_id, page, chunk_index, text_raw, text_zh, embedding_status, created_at
+)
+SELECT id, document_id, page, chunk_index, text_raw, NULL, 'pending', created_at
+FROM staging.staged_chunks
+"""
+_SQL_UPDATE_DOC_READY = """
+UPDATE documents
+SET status = ?, page_count = ?, translation_status = ?, translation_error_message = ?, updated_at = ?
+WHERE id = ?
+"""
+_SQL_SELECT_UNTRANSLATED_BY_DOC = """
+SELECT id, text_raw
+FROM document_chunks
+WHERE document_id = ? AND (text_zh IS NULL OR text_zh = '')
+ORDER BY page, chunk_index
+"""
+_SQL_SELECT_UNTRANSLATED_BY_PAGE = """
+SELECT id, text_raw
+FROM document_chunks
+WHERE document_id = ? AND page = ? AND (text_zh IS NULL OR text_zh = '')
+ORDER BY chunk_index
+"""
+_SQL_REFRESH_TRANSLATION_STATUS = """
+UPDATE documents
+SET translation_status = CASE (
+        SELECT COUNT(1)
+        FROM document_chunks
+        WHERE document_id = ? AND (text_zh IS NULL OR text_zh = '')
+    ) WHEN 0 THEN 'ready' ELSE 'pending' END,
+    translation_error_message = NULL,
+    updated_at = ?
+WHERE id = ?
+"""
 
 
 def enqueue_document(document_id: str) -> None:
-    _job_queue.put(("parse", document_id, None))
+    _submit(_process_document, document_id)
 
 
 def enqueue_translation(document_id: str, page: int | None = None) -> None:
-    _job_queue.put(("translate", document_id, page))
+    _submit(_process_translation, document_id, page)
 
 
 def start_worker() -> None:
-    global _worker_started
-    with _worker_lock:
-        if _worker_started:
+    global _executor, _translate_executor
+    with _executor_lock:
+        if _executor is not None:
             return
-        thread = threading.Thread(target=_run_worker, daemon=True)
-        thread.start()
-        _worker_started = True
+        _executor = ThreadPoolExecutor(
+            max_workers=JOB_MAX_WORKERS, thread_name_prefix="doc-pro-job"
+        )
+        _translate_executor = ThreadPoolExecutor(
+            max_workers=TRANSLATE_MAX_WORKERS, thread_name_prefix="doc-pro-translate"
+        )
 
 
-def _run_worker() -> None:
-    while True:
-        job_type, document_id, page = _job_queue.get()
-        try:
-            if job_type == "parse":
-                _process_document(document_id)
-            elif job_type == "translate":
-                _process_translation(document_id, page)
-        finally:
-            _job_queue.task_done()
+def stop_worker() -> None:
+    global _executor, _translate_executor, _extract_pool
+    with _executor_lock:
+        executors = (_executor, _translate_executor, _extract_pool)
+        _executor = None
+        _translate_executor = None
+        _extract_pool = None
+    # Cancelling runs the done callbacks, which take _executor_lock.
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(fn: Callable[..., None], document_id: str, *args: Any) -> None:
+    with _executor_lock:
+        if _executor is None:
+            raise RuntimeError("Background worker is not running.")
+        pending = _pending_jobs.get(document_id)
+        if pending is not None:
+            # Jobs for the same document run one at a time, so a repeated
+            # translate request finds the chunks already translated instead of
+            # paying twice. Wait here rather than on a pool thread; an
+            # identical job already waiting covers this one.
+            if (fn, args) not in pending:
+                pending.append((fn, args))
+            return
+        _pending_jobs[document_id] = deque()
+        future = _executor.submit(fn, document_id, *args)
+    future.add_done_callback(functools.partial(_job_done, document_id))
+
+
+def _job_done(document_id: str, future: Future[None]) -> None:
+    _log_job_failure(future)
+    with _executor_lock:
+        pending = _pending_jobs[document_id]
+        if not pending or _executor is None:
+            del _pending_jobs[document_id]
+            return
+        fn, args = pending.popleft()
+        future = _executor.submit(fn, document_id, *args)
+    future.add_done_callback(functools.partial(_job_done, document_id))
+
+
+def _log_job_failure(future: Future[None]) -> None:
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Background job failed", exc_info=exc)
 
 
 def _process_document(document_id: str) -> None:
     now = _now_iso()
-    db.execute(
-        "UPDATE documents SET status = ?, updated_at = ?, error_message = NULL WHERE id = ?",
-        ("processing", now, document_id),
-    )
-
-    document = db.fetch_one(
-        "SELECT id, file_path FROM documents WHERE id = ?",
-        (document_id,),
-    )
+    db.execute(_SQL_UPDATE_DOC_PROCESSING, ("processing", now, document_id))
+
+    document = db.fetch_one(_SQL_SELECT_DOC_FILE, (document_id,))
     if not document:
         return
 
     try:
+        page_counter = itertools.count()
         pages = _extract_pdf_pages(Path(document["file_path"]))
-        chunks = _build_chunks(document_id, pages)
-
-        db.execute("DELETE FROM document_chunks WHERE document_id = ?", (document_id,))
-        if chunks:
-            db.executemany(
-                """
-                INSERT INTO document_chunks (
-                    id, document_id, page, chunk_index, text_raw, text_zh, embedding_status, created_at
-                ) VALUES (?, ?, ?, ?, ?, NULL, 'pending', ?)
-                """,
-                chunks,
-            )
-
-        db.execute(
-            """
-            UPDATE documents
-            SET status = ?, page_count = ?, translation_status = ?, translation_error_message = ?, updated_at = ?
-            WHERE id = ?
-            """,
-            ("ready", len(pages), "pending", None, _now_iso(), document_id),
-        )
+        chunks = _build_chunks(document_id, pages, page_counter)
+
+        # Extraction runs while the rows are written to a scratch database
+        # file, which takes no lock on the main database. Only the swap below
+        # holds the write lock.
+        with _staging_db(document_id):
+            with db.transaction() as conn:
+                conn.execute(_SQL_CREATE_STAGED_CHUNKS)
+                conn.executemany(_SQL_STAGE_CHUNK, chunks)
+
+            with db.transaction() as conn:
+                conn.execute(_SQL_DELETE_CHUNKS, (document_id,))
+                conn.execute(_SQL_INSERT_STAGED_CHUNKS)
+                conn.execute(
+                    _SQL_UPDATE_DOC_READY,
+                    ("ready", next(page_counter), "pending", None, _now_iso(), document_id),
+                )
     except Exception as exc:  # noqa: BLE001
-        db.execute(
-            "UPDATE documents SET status = ?, error_message = ?, updated_at = ? WHERE id = ?",
-            ("failed", str(exc), _now_iso(), document_id),
-        )
+        db.execute(_SQL_UPDATE_DOC_FAILED, ("failed", str(exc), _now_iso(), document_id))
+
+
+@contextmanager
+def _staging_db(document_id: str) -> Iterator[None]:
+    # A file rather than a TEMP table: temp_store=MEMORY would hold the whole
+    # document in RAM. Jobs for one document never overlap, so the name is
+    # free unless a crashed run left it behind.
+    path = db.DB_DIR / f"staging-{document_id}.db"
+    path.unlink(missing_ok=True)
+    db.execute(_SQL_ATTACH_STAGING, (str(path),))
+    try:
+        for pragma in _STAGING_PRAGMAS:
+            db.execute(pragma)
+        yield
+    finally:
+        db.execute(_SQL_DETACH_STAGING)
+        path.unlink(missing_ok=True)
 
 
 def _process_translation(document_id: str, page: int | None) -> None:
-    document = db.fetch_one(
-        "SELECT id, status FROM documents WHERE id = ?",
-        (document_id,),
-    )
+    document = db.fetch_one(_SQL_SELECT_DOC_STATUS, (document_id,))
     if not document:
         return
     if document["status"] != "ready":
         db.execute(
-            """
-            UPDATE documents
-            SET translation_status = ?, translation_error_message = ?, updated_at = ?
-            WHERE id = ?
-            """,
+            _SQL_UPDATE_TRANSLATION_STATUS,
             ("failed", "Document is not ready for translation.", _now_iso(), document_id),
         )
         return
 
-    db.execute(
-        """
-        UPDATE documents
-        SET translation_status = ?, translation_error_message = ?, updated_at = ?
-        WHERE id = ?
-        """,
-        ("processing", None, _now_iso(), document_id),
-    )
+    db.execute(_SQL_UPDATE_TRANSLATION_STATUS, ("processing", None, _now_iso(), document_id))
 
     if page is None:
-        chunks = db.fetch_all(
-            """
-            SELECT id, text_raw
-            FROM document_chunks
-            WHERE document_id = ? AND (text_zh IS NULL OR text_zh = '')
-            ORDER BY page, chunk_index
-            """,
-            (document_id,),
-        )
+        chunks = db.fetch_all(_SQL_SELECT_UNTRANSLATED_BY_DOC, (document_id,))
     else:
-        chunks = db.fetch_all(
-            """
-            SELECT id, text_raw
-            FROM document_chunks
-            WHERE document_id = ? AND page = ? AND (text_zh IS NULL OR text_zh = '')
-            ORDER BY chunk_index
-            """,
-            (document_id, page),
-        )
+        chunks = db.fetch_all(_SQL_SELECT_UNTRANSLATED_BY_PAGE, (document_id, page))
 
+    updates: list[tuple[str, str]] = []
     try:
-        for chunk in chunks:
-            translated = translate_text_with_gen_ai(chunk["text_raw"])
-            db.execute(
-                "UPDATE document_chunks SET text_zh = ? WHERE id = ?",
-                (translated, chunk["id"]),
-            )
-    except Exception as exc:  # noqa: BLE001
-        db.execute(
-            """
-            UPDATE documents
-            SET translation_status = ?, translation_error_message = ?, updated_at = ?
-            WHERE id = ?
-            """,
-            ("failed", str(exc), _now_iso(), document_id),
+        if _translate_executor is None:
+            raise RuntimeError("Background worker is not running.")
+        translations = _translate_executor.map(
+            translate_text_with_gen_ai, [chunk["text_raw"] for chunk in chunks]
         )
+        for chunk, translated in zip(chunks, translations):
+            updates.append((translated, chunk["id"]))
+            if len(updates) >= TRANSLATE_BATCH_SIZE:
+                _flush_translations(updates)
+    except Exception as exc:  # noqa: BLE001
+        db.execute(_SQL_UPDATE_TRANSLATION_STATUS, ("failed", str(exc), _now_iso(), document_id))
         return
+    finally:
+        _flush_translations(updates)
 
     _refresh_translation_status(document_id)
 
 
-def _extract_pdf_pages(path: Path) -> list[str]:
+def _flush_translations(updates: list[tuple[str, str]]) -> None:
+    if not updates:
+        return
+    db.executemany(_SQL_UPDATE_CHUNK_ZH, updates)
+    updates.clear()
+
+
+def _extract_pdf_pages(path: Path) -> Iterator[str]:
     reader = PdfReader(str(path))
-    pages: list[str] = []
-    for page in reader.pages:
-        text = page.extract_text() or ""
-        pages.append(_normalize_text(text))
-    return pages
+    num_pages = len(reader.pages)
+    pool = _get_extract_pool() if num_pages >= PARALLEL_EXTRACT_MIN_PAGES else None
+    done = 0
+    if pool is not None:
+        del reader
+        try:
+            for text in pool.map(
+                _extract_page, itertools.repeat(str(path)), range(num_pages), chunksize=4
+            ):
+                yield text
+                done += 1
+            return
+        except BrokenProcessPool:
+            logger.warning(
+                "Extraction pool broke; extracting %s serially from page %d", path, done + 1
+            )
+            _discard_extract_pool(pool)
+        reader = PdfReader(str(path))
+
+    for page in itertools.islice(reader.pages, done, None):
+        yield _normalize_text(page.extract_text() or "")
+
+
+def _get_extract_pool() -> ProcessPoolExecutor | None:
+    global _extract_pool
+    if (os.cpu_count() or 1) <= 1:
+        return None
+    with _executor_lock:
+        if _extract_pool is None:
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _extract_pool
+
+
+def _discard_extract_pool(pool: ProcessPoolExecutor) -> None:
+    global _extract_pool
+    with _executor_lock:
+        if _extract_pool is pool:
+            _extract_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
 
+def _extract_page(path: str, index: int) -> str:
+    # Runs in a pool process; keep the last reader so consecutive pages of the
+    # same document do not re-parse the file.
+    global _page_reader, _page_reader_path
+    if _page_reader is None or _page_reader_path != path:
+        _page_reader = PdfReader(path)
+        _page_reader_path = path
+    return _normalize_text(_page_reader.pages[index].extract_text() or "")
 
-def _build_chunks(document_id: str, pages: list[str]) -> list[tuple[str, str, int, int, str, str]]:
-    rows: list[tuple[str, str, int, int, str, str]] = []
+
+def _build_chunks(
+    document_id: str, pages: Iterable[str], page_counter: Iterator[int]
+) -> Iterator[tuple[str, str, int, int, str, str]]:
+    now = _now_iso()
+    # One urandom read per document; the low 32 bits of each id are a counter.
+    id_prefix = os.urandom(12)
+    chunk_seq = itertools.count()
     for page_num, text in enumerate(pages, start=1):
-        chunks = _split_text(text)
-        for idx, chunk_text in enumerate(chunks):
-            rows.append(
-                (
-                    str(uuid.uuid4()),
-                    document_id,
-                    page_num,
-                    idx,
-                    chunk_text,
-                    _now_iso(),
-                )
+        next(page_counter)
+        for idx, chunk_text in enumerate(_split_text(text)):
+            chunk_id = uuid.UUID(bytes=id_prefix + next(chunk_seq).to_bytes(4, "big"), version=4)
+            yield (
+                str(chunk_id),
+                document_id,
+                page_num,
+                idx,
+                chunk_text,
+                now,
             )
-    return rows
 
 
 def _split_text(text: str) -> list[str]:
-    if not text.strip():
+    if not text:
         return []
 
-    chunks: list[str] = []
-    start = 0
+    # Pages are already normalized, so windows need no stripping; stop at the
+    # first window that reaches the end of the text.
     step = CHUNK_SIZE - CHUNK_OVERLAP
-    while start < len(text):
-        end = min(start + CHUNK_SIZE, len(text))
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        if end == len(text):
-            break
-        start += step
-    return chunks
+    stop = max(len(text) - CHUNK_OVERLAP, 1)
+    return [text[i : i + CHUNK_SIZE] for i in range(0, stop, step)]
 
 
 def _normalize_text(text: str) -> str:
-    lines = [line.strip() for line in text.splitlines()]
-    non_empty = [line for line in lines if line]
-    return "\n".join(non_empty)
+    return "\n".join(filter(None, map(str.strip, text.splitlines())))
 
 
 def _now_iso() -> str:
@@ -219,21 +375,4 @@ def _now_iso() -> str:
 
 
 def _refresh_translation_status(document_id: str) -> None:
-    untranslated = db.fetch_one(
-        """
-        SELECT COUNT(1) AS cnt
-        FROM document_chunks
-        WHERE document_id = ? AND (text_zh IS NULL OR text_zh = '')
-        """,
-        (document_id,),
-    )
-    remaining = untranslated["cnt"] if untranslated else 0
-    next_status = "ready" if remaining == 0 else "pending"
-    db.execute(
-        """
-        UPDATE documents
-        SET translation_status = ?, translation_error_message = ?, updated_at = ?
-        WHERE id = ?
-        """,
-        (next_status, None, _now_iso(), document_id),
-    )
+    db.execute(_SQL_REFRESH_TRANSLATION_STATUS, (document_id, _now_iso(), document_id))
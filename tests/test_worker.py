@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import itertools
+import random
+import uuid
+
+import pytest
+
+from doc_pro.worker import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    _build_chunks,
+    _normalize_text,
+    _split_text,
+)
+
+
+def _split_text_reference(text: str) -> list[str]:
+    if not text.strip():
+        return []
+
+    chunks: list[str] = []
+    start = 0
+    step = CHUNK_SIZE - CHUNK_OVERLAP
+    while start < len(text):
+        end = min(start + CHUNK_SIZE, len(text))
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end == len(text):
+            break
+        start += step
+    return chunks
+
+
+def _page_text(length: int, seed: int) -> str:
+    rng = random.Random(seed)
+    raw = "".join(rng.choice("abcdefgh  \n\n\t") for _ in range(length + length // 4))
+    return _normalize_text(raw)[:length]
+
+
+STEP = CHUNK_SIZE - CHUNK_OVERLAP
+LENGTHS = sorted(
+    {
+        n + d
+        for n in (0, CHUNK_OVERLAP, STEP, CHUNK_SIZE, STEP + CHUNK_SIZE, 5 * STEP + CHUNK_OVERLAP)
+        for d in (-1, 0, 1)
+        if n + d >= 0
+    }
+    | {2, 37, 5000, 12345}
+)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+@pytest.mark.parametrize("seed", range(3))
+def test_split_text_matches_reference(length: int, seed: int) -> None:
+    text = _page_text(length, seed)
+    chunks = _split_text(text)
+
+    assert [c.strip() for c in chunks] == _split_text_reference(text)
+    if not text:
+        return
+    assert chunks[0] == text[:CHUNK_SIZE]
+    assert text.endswith(chunks[-1])
+    for i, chunk in enumerate(chunks):
+        assert chunk == text[i * STEP : i * STEP + CHUNK_SIZE]
+    for prev, cur in itertools.pairwise(chunks):
+        assert len(prev) == CHUNK_SIZE
+        assert prev[STEP:] == cur[:CHUNK_OVERLAP]
+
+
+def test_split_text_empty() -> None:
+    assert _split_text("") == []
+
+
+def test_build_chunks_ids_unique_uuid4_across_pages() -> None:
+    pages = [_page_text(n, seed) for seed, n in enumerate((3000, 0, 801, 12345, 5))]
+    page_counter = itertools.count()
+
+    rows = list(_build_chunks("doc-1", iter(pages), page_counter))
+
+    assert next(page_counter) == len(pages)
+    assert len(rows) == sum(len(_split_text(p)) for p in pages)
+    ids = [row[0] for row in rows]
+    assert len(set(ids)) == len(ids)
+    for chunk_id in ids:
+        parsed = uuid.UUID(chunk_id)
+        assert str(parsed) == chunk_id
+        assert parsed.version == 4
+        assert parsed.variant == uuid.RFC_4122
+
+    for page_num, page in enumerate(pages, start=1):
+        page_rows = [row for row in rows if row[2] == page_num]
+        assert [row[3] for row in page_rows] == list(range(len(page_rows)))
+        assert [row[4] for row in page_rows] == _split_text(page)
+    assert {row[1] for row in rows} == {"doc-1"}
+    assert len({row[5] for row in rows}) == 1
+
+
+def test_build_chunks_ids_differ_between_documents() -> None:
+    pages = [_page_text(2000, 0)]
+    first = [row[0] for row in _build_chunks("a", pages, itertools.count())]
+    second = [row[0] for row in _build_chunks("a", pages, itertools.count())]
+
+    assert not set(first) & set(second)